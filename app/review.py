@@ -1,6 +1,6 @@
 # app/review.py
 from __future__ import annotations
-import os, sqlite3, subprocess, sys, datetime, uuid, json
+import os, sqlite3, subprocess, sys, datetime, time, uuid, json
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, make_response
 from jinja2 import TemplateNotFound
 
@@ -8,6 +8,8 @@ from jinja2 import TemplateNotFound
 from infra.memory import load_memory  # ensures memory tables via load_memory->ensure_memory_tables
 # Ensure DB schema (all columns used by this blueprint)
 from generate_req_bdd import ensure_schema  # NEW
+# Shared memory_action log (schema + row layout owned by the pipeline module)
+from run_pipeline import _AUX_DDL, _ACTION_COLUMNS, _SQL_INSERT_ACTION, _memory_action_row
 
 # NOTE: template_folder is crucial so tests can find app/templates/*
 bp = Blueprint("review", __name__, url_prefix="/review", template_folder="templates")
@@ -15,8 +17,15 @@ bp = Blueprint("review", __name__, url_prefix="/review", template_folder="templa
 DB_PATH = os.getenv("REPO_DB_PATH", "repo.db")
 PROJECT_ID = os.getenv("PROJECT_ID", "myproject")
 
+def _ensure_action_log():
+    """memory_action (+ sessions/memory_session) — the session snapshot reads review actions from it."""
+    con = sqlite3.connect(DB_PATH)
+    con.executescript(_AUX_DDL)
+    con.close()
+
 # Ensure tables/columns exist up-front so fresh DBs work
 ensure_schema()  # NEW
+_ensure_action_log()
 
 # ------------------------ DB helpers ------------------------
 
@@ -39,7 +48,10 @@ def _get_actions(conn: sqlite3.Connection, session_id: str) -> list[dict]:
     return json.loads((row["last_actions_json"] or "[]") if row else "[]")
 
 def append_action(conn: sqlite3.Connection, session_id: str, action: dict) -> None:
-    """Store a small rolling log of actions (max 20) and keep a compact rolling_summary."""
+    """
+    Store a small rolling log of actions (max 20) and keep a compact rolling_summary;
+    also log the action to memory_action for the session snapshot.
+    """
     actions = _get_actions(conn, session_id)
     actions.append({"ts": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z", **action})
     actions = actions[-20:]
@@ -55,6 +67,11 @@ def append_action(conn: sqlite3.Connection, session_id: str, action: dict) -> No
         "UPDATE sessions SET last_actions_json=?, rolling_summary=?, updated_at=CURRENT_TIMESTAMP WHERE session_id=?",
         (json.dumps(actions), rolling_summary, session_id)
     )
+    extra = {k: v for k, v in action.items() if k not in _ACTION_COLUMNS}
+    conn.execute(_SQL_INSERT_ACTION, _memory_action_row(
+        session_id, int(time.time()), action.get("actor", "user"), action.get("action", "do"),
+        extra, action.get("step"), action.get("mode"),
+    ))
     conn.commit()
 
 # ------------------------ Views ------------------------
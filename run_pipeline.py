@@ -7,7 +7,11 @@ Runs the Synapse GenAI pipeline (Requirements → BDD → Persist → Jira).
 Modes:
 - Default: "agentic" (multi-agent controller via agents/agentic_controller.py)
 - Fallback: "classic" (direct generate_req_bdd.py pipeline)
-- Always tries CSV export (export_csv.py) and optional Jira sync (idempotent).
+- Always tries CSV export (export_csv.py, imported in-process) and optional Jira sync (idempotent).
+
+Subsystem imports (agents.*, generate_req_bdd, subprocess) are deferred to the
+function that needs them, so `--mode classic --no-jira --no-export` and importers
+such as app/app.py don't pay for the agent stack.
 
 Session Capability:
 - session_id is created and persisted.
@@ -16,29 +20,32 @@ Session Capability:
 - Compact context (rolling summary + transcript summary) injected into agent prompts.
 
 This version unifies logging with the UI by:
-- Writing actions to BOTH `sessions.last_actions_json` and `memory_action`.
+- Writing actions to `memory_action` only (`sessions.last_actions_json` is kept
+  for back-compat readers but no longer written by this module).
 - Reading rolling summary from `memory_session.rolling_summary` (fallback to sessions.rolling_summary).
-- Merging recent actions from memory_action and sessions for /api/session consumers.
+- Reading recent actions from memory_action for /api/session consumers.
 
 NOTE (tests):
 tests/test_session_helpers.py imports session helpers from THIS module.
 The helper functions below ensure:
 - `get_session_snapshot` ALWAYS prefixes "Recent actions:".
-- `get_session_snapshot` returns `last_actions` solely from legacy `sessions.last_actions_json`
-  so after two appends the length is exactly 2 (as the test expects).
+- `get_session_snapshot` returns `last_actions` from the session's newest
+  `memory_action` rows, so after two appends the length is exactly 2 (as the test expects).
 """
 
 from __future__ import annotations
 import os
 import sys
-import subprocess
 import argparse
 import sqlite3
+import threading
+import time
 import uuid
 import json
-from datetime import datetime, timezone
+import functools
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 import re  # for transcript cleanup
 
 # --- Ensure repo root is on sys.path ---
@@ -54,196 +61,325 @@ PROJECT_ID = os.getenv("PROJECT_ID", "myproject")
 JIRA_SYNC_ON_PIPELINE_DEFAULT = os.getenv("JIRA_SYNC_ON_PIPELINE", "1") == "1"
 JIRA_APPROVED_ONLY_DEFAULT = os.getenv("JIRA_APPROVED_ONLY", "1") == "1"
 
+# Action-log (de)serialisation: orjson when installed (2-4x faster), else stdlib json
+try:
+    import orjson
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+# Whitespace runs (compiled once; used by transcript cleanup/summaries)
+_WS_RE = re.compile(r"\s+")
+# ASCII chars other than " " that _WS_RE / str.split() treat as whitespace
+_ASCII_WS_NON_SPACE = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f"
+# (Stripped) .vtt lines that aren't speech: WEBVTT header, cue index, timecode
+_VTT_NOISE_RE = re.compile(r"(?i)WEBVTT|\d+|.*-->.*")
+
 # -----------------------------------------------------------------------------
 # Time helper
 # -----------------------------------------------------------------------------
+# (epoch second, ISO string) of the last call: actions appended within the same
+# second share one formatted timestamp
+_iso_last: tuple[int, str] = (-1, "")
+
 def _now_utc_iso() -> str:
-    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+    # same output as datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    # formatted from time.gmtime() to skip the datetime object on the hot path
+    global _iso_last
+    sec = time.time_ns() // 1_000_000_000
+    last = _iso_last
+    if last[0] == sec:
+        return last[1]
+    iso = _iso_from_epoch(sec)
+    _iso_last = (sec, iso)  # single tuple swap: safe for the tail-job threads
+    return iso
+
+def _iso_from_epoch(sec: int) -> str:
+    t = time.gmtime(sec)
+    return (f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+            f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}+00:00")
 
 def _now_epoch() -> int:
-    return int(datetime.now(timezone.utc).timestamp())
+    return time.time_ns() // 1_000_000_000
 
 # -----------------------------------------------------------------------------
 # DB + Session helpers (USED BY TESTS)
 # -----------------------------------------------------------------------------
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+# One connection is shared across threads (see get_conn); writers serialise here.
+_DB_LOCK = threading.Lock()
+
+# WAL + relaxed fsync suits the write-mostly action log; applied on every open.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",      # ~20MB page cache
+    "PRAGMA busy_timeout=5000",      # ms
+    "PRAGMA mmap_size=268435456",    # 256MB
+)
+
+# Hot-path SQL, hoisted so every call passes the identical string to the
+# connection's statement cache (see cached_statements in get_conn).
+_SQL_INSERT_SESSION = (
+    "INSERT OR IGNORE INTO sessions(session_id, project_id, rolling_summary, last_actions_json, updated_at) "
+    "VALUES(?,?,?,?,datetime('now'))"
+)
+_SQL_INSERT_SESSION_PROJECT = (
+    "INSERT OR IGNORE INTO memory_session(session_id, key, value) VALUES(?, 'project_id', ?)"
+)
+_SQL_TOUCH_SESSION = "UPDATE sessions SET updated_at=datetime('now') WHERE session_id=?"
+_SQL_PREPEND_SUMMARY = """
+  INSERT INTO memory_session(session_id, key, value) VALUES(?1, ?2, ?3)
+  ON CONFLICT(session_id, key) DO UPDATE SET value = CASE
+    WHEN excluded.key = 'rolling_summary'
+      THEN substr(excluded.value || COALESCE(memory_session.value, ''), 1, ?4)
+    ELSE excluded.value
+  END
+"""
+_SQL_INSERT_ACTION = (
+    "INSERT INTO memory_action(session_id, ts, actor, action, step, mode, payload) VALUES(?,?,?,?,?,?,?)"
+)
+_SQL_KV_UPSERT = (
+    "INSERT INTO memory_session(session_id, key, value) VALUES(?,?,?) "
+    "ON CONFLICT(session_id, key) DO UPDATE SET value=excluded.value"
+)
+_SQL_KV_GET = "SELECT value FROM memory_session WHERE session_id=? AND key=?"
+_SQL_SNAPSHOT = "SELECT session_id, project_id, updated_at FROM sessions WHERE session_id=?"
+# newest first, served by idx_memory_action_session_ts. UI telemetry (actor='ui':
+# session_start, 60s heartbeats) is left out so it can't crowd the pipeline/review
+# actions out of the window (and out of the LLM context hint).
+_SQL_RECENT_ACTIONS = (
+    "SELECT ts, actor, action, step, mode, payload FROM memory_action "
+    "WHERE session_id=? AND COALESCE(actor, '') <> 'ui' ORDER BY ts DESC, id DESC LIMIT ?"
+)
+
+def get_conn(check_same_thread: bool = False) -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
     return conn
 
-def run_memory_migration_once():
+@contextmanager
+def _write_txn(conn: sqlite3.Connection):
+    """
+    Commit on exit, unless the caller already holds an open transaction
+    (e.g. an outer `with _write_txn(conn):` around several helpers) — then the
+    caller commits once. A bare `with conn:` does NOT open one: the helpers
+    inside would each BEGIN/COMMIT on their own.
+    Own transactions start with BEGIN IMMEDIATE so read-then-write helpers like
+    append_action take the write lock up front (one fsync, no BUSY on upgrade).
+    """
+    if conn.in_transaction:
+        yield conn
+    else:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+@functools.lru_cache(maxsize=32)
+def _exists(path: str) -> bool:
+    """os.path.exists, cached for the process lifetime (static repo files only)."""
+    return os.path.exists(path)
+
+_MIGRATED = False
+
+def run_memory_migration_once(conn: sqlite3.Connection | None = None):
+    """Apply infra/memory.sql, on the caller's connection when given (main's shared one)."""
+    global _MIGRATED
+    if _MIGRATED:
+        return
     ddl_path = os.path.join("infra", "memory.sql")
-    if os.path.exists(ddl_path):
-        conn = get_conn()
+    if _exists(ddl_path):
+        own = conn is None
+        if own:
+            conn = get_conn()
         with open(ddl_path, "r", encoding="utf-8") as f:
             conn.executescript(f.read())
         conn.commit()
-        conn.close()
+        if own:
+            conn.close()
+        _MIGRATED = True
+
+# legacy "sessions" table used by app imports & tests, plus the unified memory tables
+_AUX_DDL = """
+CREATE TABLE IF NOT EXISTS sessions(
+  session_id TEXT PRIMARY KEY,
+  project_id TEXT,
+  rolling_summary TEXT,
+  last_actions_json TEXT,
+  updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS memory_action(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id TEXT NOT NULL,
+  ts INTEGER NOT NULL,
+  actor TEXT,
+  action TEXT,
+  step TEXT,
+  mode TEXT,
+  payload TEXT
+);
+CREATE TABLE IF NOT EXISTS memory_session(
+  session_id TEXT NOT NULL,
+  key TEXT NOT NULL,
+  value TEXT,
+  PRIMARY KEY(session_id, key)
+);
+CREATE INDEX IF NOT EXISTS idx_memory_action_session_ts ON memory_action(session_id, ts DESC);
+CREATE INDEX IF NOT EXISTS idx_memory_session_sid_key ON memory_session(session_id, key);
+"""
 
 def _ensure_aux_tables(conn: sqlite3.Connection):
-    cur = conn.cursor()
-    # legacy "sessions" table used by app imports & tests
-    cur.execute("""
-      CREATE TABLE IF NOT EXISTS sessions(
-        session_id TEXT PRIMARY KEY,
-        project_id TEXT,
-        rolling_summary TEXT,
-        last_actions_json TEXT,
-        updated_at TEXT
-      )
-    """)
-    # unified memory tables
-    cur.execute("""
-      CREATE TABLE IF NOT EXISTS memory_action(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        session_id TEXT NOT NULL,
-        ts INTEGER NOT NULL,
-        actor TEXT,
-        action TEXT,
-        step TEXT,
-        mode TEXT,
-        payload TEXT
-      )
-    """)
-    cur.execute("""
-      CREATE TABLE IF NOT EXISTS memory_session(
-        session_id TEXT NOT NULL,
-        key TEXT NOT NULL,
-        value TEXT,
-        PRIMARY KEY(session_id, key)
-      )
-    """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_memory_action_session_ts ON memory_action(session_id, ts DESC)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_memory_session_sid_key ON memory_session(session_id, key)")
-    conn.commit()
+    # one call for the whole batch; executescript commits any pending transaction first
+    conn.executescript(_AUX_DDL)
 
 def ensure_session(conn: sqlite3.Connection, project_id: str, incoming_session_id: str | None) -> str:
     _ensure_aux_tables(conn)
     sid = incoming_session_id or str(uuid.uuid4())
-    # sessions row (legacy snapshot)
-    conn.execute(
-        "INSERT OR IGNORE INTO sessions(session_id, project_id, rolling_summary, last_actions_json, updated_at) "
-        "VALUES(?,?,?,?,datetime('now'))",
-        (sid, project_id, "", "[]")
-    )
-    # also persist project_id in memory_session for downstream consumers
-    conn.execute("""
-      INSERT OR IGNORE INTO memory_session(session_id, key, value) VALUES(?, 'project_id', ?)
-    """, (sid, project_id))
-    conn.commit()
+    with _write_txn(conn):
+        # sessions row (legacy snapshot)
+        conn.execute(_SQL_INSERT_SESSION, (sid, project_id, "", "[]"))
+        # also persist project_id in memory_session for downstream consumers
+        conn.execute(_SQL_INSERT_SESSION_PROJECT, (sid, project_id))
     return sid
 
-def _get_actions_legacy(conn: sqlite3.Connection, session_id: str) -> list[dict]:
-    row = conn.execute("SELECT last_actions_json FROM sessions WHERE session_id=?", (session_id,)).fetchone()
-    return json.loads((row["last_actions_json"] or "[]") if row else "[]")
-
-def _set_actions_legacy(conn: sqlite3.Connection, session_id: str, actions: list[dict]) -> None:
-    conn.execute(
-        "UPDATE sessions SET last_actions_json=?, updated_at=datetime('now') WHERE session_id=?",
-        (json.dumps(actions), session_id)
-    )
-    conn.commit()
-
-def _append_bullet_to_memory_summary(conn: sqlite3.Connection, session_id: str, bullet: str, limit_chars: int = 2000) -> None:
-    if not bullet or not str(bullet).strip():
+def _recent_actions(conn: sqlite3.Connection, session_id: str, limit: int = 10) -> list[dict]:
+    """
+    Last `limit` pipeline/agent/review memory_action rows (oldest first) as
+    action dicts with an ISO ts. app/review.py logs its actions here too.
+    """
+    out = []
+    for ts, actor, action, step, mode, payload in conn.execute(_SQL_RECENT_ACTIONS, (session_id, limit)):
+        a = {"ts": _iso_from_epoch(ts), "actor": actor, "action": action}
+        if step:
+            a["step"] = step
+        if mode:
+            a["mode"] = mode
+        if payload:
+            a.update(_json_loads(payload))
+        out.append(a)
+    out.reverse()
+    return out
+
+def _append_bullets_to_memory_summary(conn: sqlite3.Connection, session_id: str, bullets: List[str], limit_chars: int = 2000) -> None:
+    """Prepend bullets (given oldest first) so the newest ends up on top."""
+    block = "".join(f"• {b.strip()}\n" for b in reversed(bullets) if b and str(b).strip())
+    if not block:
         return
-    cur = conn.cursor()
-    row = cur.execute(
-        "SELECT value FROM memory_session WHERE session_id=? AND key='rolling_summary'",
-        (session_id,)
-    ).fetchone()
-    current = row["value"] if row and row["value"] else ""
-    merged = f"• {bullet.strip()}\n{current}"
-    compact = merged[:limit_chars]
-    cur.execute("""
-      INSERT INTO memory_session(session_id, key, value) VALUES(?, 'rolling_summary', ?)
-      ON CONFLICT(session_id, key) DO UPDATE SET value=excluded.value
-    """, (session_id, compact))
-    cur.execute("""
-      INSERT INTO memory_session(session_id, key, value) VALUES(?, 'updated_at', ?)
-      ON CONFLICT(session_id, key) DO UPDATE SET value=excluded.value
-    """, (session_id, _now_utc_iso()))
-    conn.commit()
-
-def _insert_memory_action(conn: sqlite3.Connection, session_id: str, actor: str, action: str, payload: dict | None = None, *, step: str | None = None, mode: str | None = None) -> None:
-    conn.execute("""
-      INSERT INTO memory_action(session_id, ts, actor, action, step, mode, payload)
-      VALUES(?,?,?,?,?,?,?)
-    """, (session_id, _now_epoch(), actor, action, step, mode, json.dumps(payload or {})))
-    conn.commit()
+    # Prepend happens in SQL (no SELECT round-trip); rolling_summary + updated_at in one executemany.
+    # No in-process copy of the summary: the UI and agents prepend to the same key.
+    with _write_txn(conn):
+        conn.executemany(_SQL_PREPEND_SUMMARY, [
+            (session_id, "rolling_summary", block[:limit_chars], limit_chars),
+            (session_id, "updated_at", _now_utc_iso(), limit_chars),
+        ])
+
+def _memory_action_row(session_id: str, ts: int, actor: str, action: str, payload: dict | None,
+                       step: str | None, mode: str | None) -> tuple:
+    # empty payload -> SQL NULL (read back as {}): no json.dumps for plain step/start/end rows
+    return (session_id, ts, actor, action, step, mode, _json_dumps(payload) if payload else None)
+
+# action keys that already have their own memory_action column
+_ACTION_COLUMNS = frozenset(("actor", "action", "step", "mode"))
+
+def _stamp_action(action: dict) -> tuple[int, dict]:
+    """(epoch for memory_action.ts, action) taken when the action happens."""
+    return _now_epoch(), action
+
+def _write_actions(conn: sqlite3.Connection, session_id: str, batch: List[tuple[int, dict]]) -> None:
+    """
+    Persist stamped actions in one transaction: one 'memory_action' row each,
+    their bullets prepended to memory_session.rolling_summary for UI "Recent
+    actions", and a touch of sessions.updated_at.
+    """
+    rows: List[tuple] = []
+    bullets: List[str] = []
+    for epoch, action in batch:
+        # concise summary line for bullet
+        who = action.get("actor", "system")
+        kind = action.get("action", "do")
+        item = action.get("item") or action.get("item_id") or action.get("mode") or action.get("step") or ""
+        extra = {k: v for k, v in action.items() if k not in _ACTION_COLUMNS}
+        rows.append(_memory_action_row(session_id, epoch, who, kind, extra, action.get("step"), action.get("mode")))
+        bullets.append(f"{kind}{(' ' + str(item)) if item else ''}")
+
+    with _DB_LOCK, _write_txn(conn):
+        # --- memory_action rows (unified log; get_session_snapshot reads its tail) ---
+        conn.executemany(_SQL_INSERT_ACTION, rows)
+
+        # --- memory_session.rolling_summary bullets (prepend) ---
+        _append_bullets_to_memory_summary(conn, session_id, bullets)
+
+        # sessions.last_actions_json / rolling_summary are no longer written;
+        # only updated_at is kept current for the snapshot
+        conn.execute(_SQL_TOUCH_SESSION, (session_id,))
 
 def append_action(conn: sqlite3.Connection, session_id: str, action: dict) -> None:
     """
-    Store a small rolling log of actions (max 20) in legacy 'sessions' AND
-    write a structured row to 'memory_action'. Also prepend a concise bullet
+    Write a structured row to 'memory_action' and prepend a concise bullet
     to memory_session.rolling_summary for UI "Recent actions".
     """
-    # --- legacy rolling array for snapshot ---
-    actions = _get_actions_legacy(conn, session_id)
-    actions.append({"ts": _now_utc_iso(), **action})
-    actions = actions[-20:]
-    # concise summary line for bullet
-    who = action.get("actor", "system")
-    kind = action.get("action", "do")
-    item = action.get("item") or action.get("item_id") or action.get("mode") or action.get("step") or ""
-    # update legacy fields (we still store a headered text, but tests won't rely on it)
-    lines = []
-    for a in actions[-10:]:
-        who_i = a.get("actor", "system")
-        kind_i = a.get("action", "do")
-        item_i = a.get("item") or a.get("item_id") or a.get("mode") or a.get("step") or ""
-        line = f"- {a['ts']} • {who_i} • {kind_i} {item_i}".strip()
-        lines.append(line[:220])
-    rolling_summary = "Recent actions:\n" + "\n".join(lines) if lines else ""
-    conn.execute(
-        "UPDATE sessions SET last_actions_json=?, rolling_summary=?, updated_at=datetime('now') WHERE session_id=?",
-        (json.dumps(actions), rolling_summary, session_id)
-    )
-    conn.commit()
+    _write_actions(conn, session_id, [_stamp_action(action)])
+
+class _ActionBuffer:
+    """
+    Collects actions for one session and writes them `size` at a time through
+    _write_actions (one transaction per batch). Call flush() when the run ends.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, session_id: str, size: int = 20):
+        self.conn = conn
+        self.session_id = session_id
+        self.size = size
+        self._pending: List[tuple[int, dict]] = []
 
-    # --- memory_action row (unified log) ---
-    _insert_memory_action(conn, session_id, who, kind, action, step=action.get("step"), mode=action.get("mode"))
+    def add(self, action: dict) -> None:
+        self._pending.append(_stamp_action(action))
+        if len(self._pending) >= self.size:
+            self.flush()
 
-    # --- memory_session.rolling_summary bullet (prepend) ---
-    _append_bullet_to_memory_summary(conn, session_id, f"{kind}{(' ' + str(item)) if item else ''}")
+    def flush(self) -> None:
+        if self._pending:
+            batch, self._pending = self._pending, []
+            _write_actions(self.conn, self.session_id, batch)
 
 # --- Session KV helpers backed by memory_session (existing schema) ------------
 def session_set(conn: sqlite3.Connection, session_id: str, key: str, value: str) -> None:
-    conn.execute(
-        """
-        INSERT INTO memory_session(session_id, key, value)
-        VALUES(?,?,?)
-        ON CONFLICT(session_id, key) DO UPDATE SET value=excluded.value
-        """,
-        (session_id, key, value),
-    )
-    conn.commit()
+    with _DB_LOCK, _write_txn(conn):
+        conn.execute(_SQL_KV_UPSERT, (session_id, key, value))
+
+def session_set_many(conn: sqlite3.Connection, session_id: str, items: Dict[str, str]) -> None:
+    """Upsert several memory_session keys in one executemany + one commit."""
+    if not items:
+        return
+    with _DB_LOCK, _write_txn(conn):
+        conn.executemany(_SQL_KV_UPSERT, [(session_id, k, v) for k, v in items.items()])
 
 def session_get(conn: sqlite3.Connection, session_id: str, key: str, default: str = "") -> str:
-    row = conn.execute(
-        "SELECT value FROM memory_session WHERE session_id=? AND key=?",
-        (session_id, key),
-    ).fetchone()
+    row = conn.execute(_SQL_KV_GET, (session_id, key)).fetchone()
     return row["value"] if row and row["value"] is not None else default
 
 # ---------- TEST-CRITICAL SNAPSHOT ----------
 def get_session_snapshot(conn: sqlite3.Connection, session_id: str) -> dict:
     """
-    Build a snapshot **only** from legacy 'sessions' so tests get deterministic results:
+    Build a snapshot from 'sessions' plus the memory_action tail:
       - rolling_summary ALWAYS starts with 'Recent actions:'
-      - last_actions are exactly the actions appended via append_action (no memory_action merge)
+      - last_actions are the newest 10 memory_action rows (oldest first)
     """
-    _ensure_aux_tables(conn)
-    row = conn.execute(
-        "SELECT session_id, project_id, rolling_summary, last_actions_json, updated_at FROM sessions WHERE session_id=?",
-        (session_id,),
-    ).fetchone()
+    # aux tables are created by ensure_session, which every caller runs first
+    row = conn.execute(_SQL_SNAPSHOT, (session_id,)).fetchone()
 
-    actions = json.loads(row["last_actions_json"] or "[]") if row and row["last_actions_json"] else []
+    actions = _recent_actions(conn, session_id, 10)
 
-    # Build a headered, newest-first summary purely from legacy actions
+    # Build a headered, newest-first summary purely from the logged actions
     lines = ["Recent actions:"]
-    for a in reversed(actions[-10:]):  # newest first
+    for a in reversed(actions):  # newest first
         kind = a.get("action", "do")
         if a.get("step"):
             lines.append(f"• {kind} {a['step']}")
@@ -261,7 +397,7 @@ def get_session_snapshot(conn: sqlite3.Connection, session_id: str) -> dict:
         "session_id": session_id,
         "project_id": (row["project_id"] if row and row["project_id"] else PROJECT_ID),
         "rolling_summary": rolling_summary,
-        "last_actions": actions[-10:],  # test expects len==2 after two appends
+        "last_actions": actions,  # test expects len==2 after two appends
         "last_transcript_summary": session_get(conn, session_id, "last_transcript_summary", ""),
         "ui_state": session_get(conn, session_id, "ui_state", ""),
         "updated_at": row["updated_at"] if row else "",
@@ -275,19 +411,47 @@ def get_compact_context(conn: sqlite3.Connection, session_id: str, max_chars: in
     """
     snap = get_session_snapshot(conn, session_id)
     transcript = snap.get("last_transcript_summary", "") or ""
-    text = (snap["rolling_summary"] + ("\n" if transcript else "") + transcript).strip()
-    return text[:max_chars]
+    return (snap["rolling_summary"] + ("\n" if transcript else "") + transcript).strip()[:max_chars]
 
 # --- Minimal local transcript mini-summarizer (fast, no LLM call) ------------
-def _quick_summarize(text: str, max_len: int = 1200) -> str:
+def _collapse_ws(text: str) -> str:
+    # collapse whitespace; the regex pass is skipped only for ASCII text with no
+    # double space or other ASCII whitespace (NBSP/Unicode spaces always go through)
+    if not text.isascii() or "  " in text or any(c in text for c in _ASCII_WS_NON_SPACE):
+        text = _WS_RE.sub(" ", text)
+    return text.strip()
+
+def _quick_summarize(text: str | bytes, max_len: int = 1200) -> str:
     """
     Return a compact summary no longer than max_len characters.
     Keeps head and tail around an ellipsis, while guaranteeing length.
+    Accepts raw UTF-8 bytes too (only the head/tail windows get decoded).
     """
     if not text:
         return ""
-    # collapse whitespace
-    text = " ".join(text.split())
+    raw = isinstance(text, (bytes, bytearray, memoryview))
+    windows = None
+    if raw:
+        # zero-copy head/tail windows; 4 bytes/char covers any UTF-8 sequence
+        mv = memoryview(text)
+        win = max_len * 4
+        if 0 < win < len(mv) // 2:
+            windows = (str(mv[:win], "utf-8", "ignore"), str(mv[-win:], "utf-8", "ignore"))
+    elif 0 < max_len * 4 < len(text):
+        # only the head/tail can reach the summary: keep O(max_len) work on long inputs
+        windows = (text[: max_len * 2], text[-max_len * 2:])
+
+    if windows:
+        head, tail = _collapse_ws(windows[0]), _collapse_ws(windows[1])
+        # Mostly-whitespace windows can shrink below max_len, and then the dropped
+        # middle would be missing from a summary that looks complete: only use the
+        # windows when each still fills max_len, else summarise the full text.
+        if len(head) >= max_len and len(tail) >= max_len:
+            text = head + " " + tail
+        else:
+            windows = None
+    if windows is None:
+        text = _collapse_ws(str(text, "utf-8", "ignore") if raw else text)
 
     if len(text) <= max_len:
         return text
@@ -310,34 +474,33 @@ def _quick_summarize(text: str, max_len: int = 1200) -> str:
 
 # --- File-based fallback: read .vtt/.txt if agent didn't return text ----------
 def _read_transcript_text(path: str | None) -> str:
-    if not path or not os.path.exists(path):
+    # no separate exists() stat: a missing file fails the read below just as fast
+    if not path:
         return ""
+    is_vtt = path.lower().endswith(".vtt")
+    kept: List[str] = []
+    # stream line by line (1MB buffer) rather than holding the raw file + its line list
     try:
-        raw = Path(path).read_text(encoding="utf-8", errors="ignore")
+        with open(path, "r", encoding="utf-8", errors="ignore", buffering=1 << 20) as f:
+            for line in f:
+                if is_vtt:
+                    # If it's .vtt, strip headers, indices, and timecodes
+                    line = line.strip()
+                    if not line or _VTT_NOISE_RE.fullmatch(line):
+                        continue
+                kept.append(line)
     except Exception:
         return ""
-    # If it's .vtt, strip headers, indices, and timecodes
-    if path.lower().endswith(".vtt"):
-        lines = []
-        for line in raw.splitlines():
-            ln = line.strip()
-            if not ln or ln.upper() == "WEBVTT":
-                continue
-            if "-->" in ln:          # timecode line
-                continue
-            if ln.isdigit():         # cue index
-                continue
-            lines.append(ln)
-        text = " ".join(lines)
-        return re.sub(r"\s+", " ", text).strip()
-    # Plain text fallback
-    return re.sub(r"\s+", " ", raw).strip()
+    # collapse whitespace, joined once at the end
+    return _WS_RE.sub(" ", " ".join(kept)).strip()
 
 # --- Ensure state carries both 'conn' and legacy 'db' keys --------------------
-def ensure_state_db(state: dict) -> dict:
+def ensure_state_db(state: dict, shared_conn: sqlite3.Connection | None = None) -> dict:
     """
     Ensure both 'conn' and legacy 'db' keys are present and valid SQLite connections.
     Some older agents expect state['db'].cursor().
+    Never opens a connection of its own: if an agent wiped both keys, the caller's
+    `shared_conn` is restored, otherwise this raises.
     """
     c = state.get("conn")
     d = state.get("db")
@@ -346,9 +509,9 @@ def ensure_state_db(state: dict) -> dict:
     if d is None and c is not None:
         d = c
     if c is None and d is None:
-        # recreate a connection if something wiped it
-        c = get_conn()
-        d = c
+        if shared_conn is None:
+            raise RuntimeError("state has neither 'conn' nor 'db'; pass the pipeline's shared connection")
+        c = d = shared_conn
     state["conn"] = c
     state["db"] = d
     return state
@@ -356,6 +519,12 @@ def ensure_state_db(state: dict) -> dict:
 # -----------------------------------------------------------------------------
 # AGENTIC MODE
 # -----------------------------------------------------------------------------
+def _record_run_start(conn: sqlite3.Connection, session_id: str, kv: Dict[str, str]) -> None:
+    """Transcript KV + the agentic "start" action in one BEGIN IMMEDIATE … COMMIT."""
+    with _write_txn(conn):
+        session_set_many(conn, session_id, kv)
+        append_action(conn, session_id, {"actor": "pipeline", "action": "start", "mode": "agentic"})
+
 def run_agentic(transcript_path: str | None, project_id: str, session_id: str, conn: sqlite3.Connection) -> dict:
     """
     Run the multi-agent controller flow, with a pre-ingest step to capture
@@ -368,18 +537,24 @@ def run_agentic(transcript_path: str | None, project_id: str, session_id: str, c
     from agents.tests_agent import TestAgent
     from agents.persist_agent import PersistAgent
 
+    step_log = _ActionBuffer(conn, session_id)
+
     def on_step(step: str, state: dict):
+        # look each list up once; reused for stdout and the action row
+        reqs = state.get("requirements", [])
+        tests = state.get("test_cases", [])
+        reqs_n = len(reqs) if isinstance(reqs, list) else None
+        tests_n = len(tests) if isinstance(tests, list) else None
         # log to stdout
         if step == "requirements":
-            print(f"🧩 Requirements: {len(state.get('requirements', []))}")
+            print(f"🧩 Requirements: {len(reqs)}")
         elif step == "tests":
-            print(f"✅ Test cases: {len(state.get('test_cases', []))}")
-        # persist to session actions
+            print(f"✅ Test cases: {len(tests)}")
+        # persist to session actions (buffered; flushed in batches / when the flow ends)
         try:
-            append_action(conn, session_id, {
+            step_log.add({
                 "actor": "pipeline", "action": "step", "step": step,
-                "reqs": len(state.get('requirements', [])) if isinstance(state.get('requirements', []), list) else None,
-                "tests": len(state.get('test_cases', [])) if isinstance(state.get('test_cases', []), list) else None
+                "reqs": reqs_n, "tests": tests_n,
             })
         except Exception:
             pass
@@ -392,7 +567,7 @@ def run_agentic(transcript_path: str | None, project_id: str, session_id: str, c
         "conn": conn,
         "db": conn,  # back-compat for agents using state['db'].cursor()
     }
-    base_state = ensure_state_db(base_state)
+    base_state = ensure_state_db(base_state, conn)
 
     ingest = IngestAgent()
     try:
@@ -402,7 +577,7 @@ def run_agentic(transcript_path: str | None, project_id: str, session_id: str, c
         state_after_ingest = ingest(dict(base_state))
 
     # Normalize in case the agent overwrote/removed the connection
-    state_after_ingest = ensure_state_db(state_after_ingest)
+    state_after_ingest = ensure_state_db(state_after_ingest, conn)
 
     # Capture transcript summary (prefer agent output, else read from file)
     tx_text = state_after_ingest.get("transcript_text") or state_after_ingest.get("clean_text") or ""
@@ -410,16 +585,14 @@ def run_agentic(transcript_path: str | None, project_id: str, session_id: str, c
     if not tx_text:
         tx_text = _read_transcript_text(candidate)
 
-    # store the path we used (for UI preview)
+    # store the path we used (for UI preview) + transcript mini-summary in one write
+    kv: Dict[str, str] = {}
     if candidate:
-        try:
-            session_set(conn, session_id, "last_transcript_path", str(candidate))
-        except Exception:
-            pass
-
+        kv["last_transcript_path"] = str(candidate)
     if tx_text:
-        mini = _quick_summarize(tx_text)
-        session_set(conn, session_id, "last_transcript_summary", mini)
+        kv["last_transcript_summary"] = _quick_summarize(tx_text)
+    # ...and log the run start in the same transaction (single commit)
+    _record_run_start(conn, session_id, kv)
 
     # Build compact context after ingest (includes rolling summary + transcript mini)
     context_hint = get_compact_context(conn, session_id)
@@ -433,10 +606,15 @@ def run_agentic(transcript_path: str | None, project_id: str, session_id: str, c
     # seed initial state for the remainder of the flow and include context_hint
     initial_state = dict(state_after_ingest)
     initial_state.update({"context_hint": context_hint})
-    initial_state = ensure_state_db(initial_state)
+    initial_state = ensure_state_db(initial_state, conn)
 
-    append_action(conn, session_id, {"actor": "pipeline", "action": "start", "mode": "agentic"})
-    result = flow.run(initial_state)
+    try:
+        result = flow.run(initial_state)
+    finally:
+        try:
+            step_log.flush()
+        except Exception:
+            pass
     append_action(conn, session_id, {"actor": "pipeline", "action": "end", "mode": "agentic"})
     print("🎯 Agentic run complete.")
     return result
@@ -456,6 +634,7 @@ def run_classic(transcript_path: str | None, project_id: str, session_id: str, c
     except Exception as e:
         print(f"⚠️ In-process classic run failed: {e}")
         print("▶ Falling back to subprocess…")
+        import subprocess
         args = [sys.executable, "generate_req_bdd.py"]
         if transcript_path:
             args.append(transcript_path)
@@ -467,13 +646,47 @@ def run_classic(transcript_path: str | None, project_id: str, session_id: str, c
 # OPTIONAL EXPORT + JIRA SYNC
 # -----------------------------------------------------------------------------
 def maybe_export_csv():
-    """Try to export CSVs if export_csv.py is available."""
+    """Try to export CSVs if export_csv.py is available (in-process, else subprocess)."""
     if Path("export_csv.py").exists():
         print("▶ Exporting CSVs via export_csv.py …")
-        subprocess.run([sys.executable, "export_csv.py"], check=True)
+        try:
+            import export_csv
+        except ImportError as e:
+            if e.name != "export_csv":
+                # one of its own deps (e.g. pandas) is missing: a child on the same
+                # interpreter would fail identically, so report it instead of forking
+                raise
+            print(f"ℹ️ export_csv not importable ({e}) — running it as a subprocess.")
+            import subprocess
+            subprocess.run([sys.executable, "export_csv.py"], check=True)
+        else:
+            export_csv.export_csv()  # same defaults as the script's CLI
     else:
         print("ℹ️ export_csv.py not found — skipping CSV export.")
 
+def _export_csv_step(conn: sqlite3.Connection, session_id: str):
+    """maybe_export_csv + action logging (safe to run on a worker thread)."""
+    try:
+        maybe_export_csv()
+        append_action(conn, session_id, {"actor": "pipeline", "action": "export_csv"})
+    except Exception as e:  # CalledProcessError from the subprocess path, anything from in-process
+        print(f"⚠️ CSV export failed: {e}")
+        append_action(conn, session_id, {"actor": "pipeline", "action": "export_csv_failed", "error": str(e)})
+
+def _run_tail_jobs(jobs: List[Callable[[], None]]) -> None:
+    """
+    Run the independent post-pipeline jobs (CSV export, Jira sync) side by side.
+    Both are I/O-bound and only share `conn` through the locked append_action.
+    """
+    if len(jobs) < 2:
+        for job in jobs:
+            job()
+        return
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        for fut in as_completed([pool.submit(job) for job in jobs]):
+            fut.result()  # re-raise anything unexpected
+
 def maybe_sync_jira(approved_only: bool, conn: sqlite3.Connection, session_id: str):
     """
     Optionally sync requirements/test cases to Jira using the idempotent Jira agent.
@@ -514,9 +727,6 @@ def maybe_sync_jira(approved_only: bool, conn: sqlite3.Connection, session_id: s
 # MAIN ENTRY POINT
 # -----------------------------------------------------------------------------
 def main():
-    # run DDL
-    run_memory_migration_once()
-
     parser = argparse.ArgumentParser(description="Run the Synapse GenAI pipeline.")
     parser.add_argument("--mode", choices=["agentic", "classic"], default=DEFAULT_MODE,
                         help="Execution mode (default from PIPELINE_MODE env, default=agentic).")
@@ -535,8 +745,9 @@ def main():
     parser.set_defaults(jira_approved_only=None)
     args = parser.parse_args()
 
-    # open DB / ensure session (reuse from CLI if provided)
+    # open DB (one connection for the whole run), run DDL, ensure session (reuse from CLI if provided)
     conn = get_conn()
+    run_memory_migration_once(conn)
     session_id = ensure_session(conn, PROJECT_ID, incoming_session_id=args.session_id)
 
     # Choose mode
@@ -557,16 +768,10 @@ def main():
     else:
         result = run_classic(args.transcript, project_id=PROJECT_ID, session_id=session_id, conn=conn)
 
-    # Optional CSV export
+    # Optional CSV export + Jira sync (idempotent), run concurrently
+    tail_jobs: List[Callable[[], None]] = []
     if not args.no_export:
-        try:
-            maybe_export_csv()
-            append_action(conn, session_id, {"actor": "pipeline", "action": "export_csv"})
-        except subprocess.CalledProcessError as e:
-            print(f"⚠️ CSV export failed: {e}")
-            append_action(conn, session_id, {"actor": "pipeline", "action": "export_csv_failed", "error": str(e)})
-
-    # Optional Jira sync (idempotent)
+        tail_jobs.append(lambda: _export_csv_step(conn, session_id))
     sync_flag = JIRA_SYNC_ON_PIPELINE_DEFAULT and not args.no_jira
     approved_only = (
         JIRA_APPROVED_ONLY_DEFAULT
@@ -574,9 +779,10 @@ def main():
         else args.jira_approved_only
     )
     if sync_flag:
-        maybe_sync_jira(approved_only=approved_only, conn=conn, session_id=session_id)
+        tail_jobs.append(lambda: maybe_sync_jira(approved_only=approved_only, conn=conn, session_id=session_id))
     else:
         print("ℹ️ Jira sync disabled (use --no-jira to force off, or set JIRA_SYNC_ON_PIPELINE=1 to enable).")
+    _run_tail_jobs(tail_jobs)
 
     # Final summary
     out_json = result.get("output_json", "output.json")
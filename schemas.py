@@ -2,60 +2,103 @@
 from __future__ import annotations
 from typing import Dict, Any, List, Iterable, Tuple
 import re
+import functools
 
 REQ_ID_RE = re.compile(r"^REQ-\d{3,}$")  # tolerant: REQ-001, REQ-0123, etc.
-ALLOWED_PRIORITIES = {"high", "medium", "low", ""}
-ALLOWED_SCENARIOS = {"positive", "negative", "regression"}
+ALLOWED_PRIORITIES = frozenset({"high", "medium", "low", ""})
+ALLOWED_SCENARIOS = frozenset({"positive", "negative", "regression"})
+
+# compiled once: these run per requirement / test case / acceptance criterion
+_REQ_ID_SEARCH = re.compile(r"REQ-?(\d+)$")
+_TAG_SPLIT = re.compile(r"[,\s]+")
+_AC_LINE_SPLIT = re.compile(r"[\n\r]+")
+_BULLET_CHARS = "-• \t"  # leading list markers on acceptance-criteria lines
+# minimal Gherkin: step keywords in this order, with their lengths for the scan
+# (Scenario: is checked on its own)
+_GHERKIN_TOKENS = tuple((tok, len(tok)) for tok in ("Given", "When", "Then"))
+
+# accepted spellings -> canonical priority (anything else -> "")
+_PRIORITY_MAP = {
+    "h": "high", "hi": "high", "high": "high",
+    "m": "medium", "med": "medium", "medium": "medium",
+    "l": "low", "lo": "low", "low": "low",
+    "": "",
+}
+
+# scenario_type aliases -> canonical scenario, and canonical scenario -> tag
+_SCENARIO_ALIAS = {
+    "pos": "positive", "positive": "positive",
+    "neg": "negative", "negative": "negative",
+    "reg": "regression", "regress": "regression", "regression": "regression",
+}
+_SCENARIO_TAG = {"positive": "@positive", "negative": "@negative", "regression": "@regression"}
 
 def _as_str(x: Any) -> str:
-    return "" if x is None else str(x)
+    if x is None:
+        return ""
+    if type(x) is str:  # common case: no str() call (exact type check, no MRO walk)
+        return x
+    return str(x)
 
 def _norm_priority(p: str) -> str:
-    p = (_as_str(p).strip().lower())
-    if p in {"h", "hi"}: p = "high"
-    elif p in {"m", "med"}: p = "medium"
-    elif p in {"l", "lo"}: p = "low"
-    return p if p in ALLOWED_PRIORITIES else ""
-
-def _norm_req_id(x: str) -> str:
-    x = _as_str(x).strip().upper()
+    return _PRIORITY_MAP.get(_as_str(p).strip().lower(), "")
+
+@functools.lru_cache(maxsize=2048)
+def _norm_req_id_cached(x: str) -> str:
     # Allow common variants like "REQ-1" or "REQ1" and pad
-    m = re.search(r"REQ-?(\d+)$", x)
+    m = _REQ_ID_SEARCH.search(x)
     if not m:
-        return _as_str(x)  # leave as-is (controller/enforcer may fix later)
+        return x  # leave as-is (controller/enforcer may fix later)
     n = int(m.group(1))
     return f"REQ-{n:03d}"
 
-def _ensure_three(items: List[str]) -> List[str]:
-    items = [i for i in items if i]
-    while len(items) < 3:
-        items.append("TBD")
-    return items[:3]
+def _norm_req_id(x: Any) -> str:
+    # the same few ids recur across requirements/test cases: memoised on the cleaned string
+    return _norm_req_id_cached(_as_str(x).strip().upper())
+
+def _has_gherkin_tokens(g: str) -> bool:
+    """
+    Scenario: present anywhere (a Background: block may put a Given before it),
+    and Given, When, Then in that order (one forward scan).
+    """
+    if "Scenario:" not in g:
+        return False
+    i = 0
+    for tok, n in _GHERKIN_TOKENS:
+        i = g.find(tok, i)
+        if i < 0:
+            return False
+        i += n
+    return True
+
+def _pad_three(items: List[str]) -> List[str]:
+    """Truncate/pad an already-cleaned list to exactly 3 items, in place."""
+    if len(items) >= 3:
+        del items[3:]
+    else:
+        items.extend(["TBD"] * (3 - len(items)))
+    return items
 
 def _norm_tags(tags: Any) -> List[str]:
     if not tags:
         return []
     if isinstance(tags, str):
         # split on whitespace/commas
-        parts = re.split(r"[,\s]+", tags)
+        parts = _TAG_SPLIT.split(tags)
     elif isinstance(tags, Iterable):
-        parts = [str(t) for t in tags]
+        parts = tags
     else:
-        parts = []
-    out: List[str] = []
+        return []
+    # one pass: strip, skip empties, @-prefix, lowercase, de-dup preserving order
+    seen: Dict[str, None] = {}
     for t in parts:
-        t = t.strip()
+        t = str(t).strip()
         if not t:
             continue
-        if not t.startswith("@"):
+        if t[0] != "@":
             t = "@" + t
-        out.append(t.lower())
-    # de-dup preserve order
-    seen = set(); dedup = []
-    for t in out:
-        if t not in seen:
-            seen.add(t); dedup.append(t)
-    return dedup
+        seen[t.lower()] = None
+    return list(seen)
 
 def validate_requirement(r: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -72,50 +115,45 @@ def validate_requirement(r: Dict[str, Any]) -> Dict[str, Any]:
 
     # acceptance criteria -> list[str] of len 3
     ac_raw = r.get("acceptance_criteria")
+    # clean + drop empties in one pass, then pad/truncate that same list
     if isinstance(ac_raw, str):
         # split on newlines or bullets
-        parts = [p.strip("-• \t") for p in re.split(r"[\n\r]+", ac_raw) if p.strip()]
+        ac = [p for p in (line.lstrip(_BULLET_CHARS).rstrip() for line in _AC_LINE_SPLIT.split(ac_raw)) if p]
     else:
-        parts = [ _as_str(x).strip() for x in (ac_raw or []) ]
-    ac = _ensure_three([p for p in parts if p])
+        ac = [p for p in (_as_str(x).strip() for x in (ac_raw or [])) if p]
+    _pad_three(ac)
 
     priority = _norm_priority(r.get("priority", ""))
     epic = _as_str(r.get("epic")).strip()
 
-    out = {
-        **r,
-        "id": rid,
-        "title": title,
-        "description": description,
-        "acceptance_criteria": ac,
-        "priority": priority,
-        "epic": epic,
-    }
-    return out
+    # r is already our own copy: fill it in place instead of spreading into a new dict
+    r["id"] = rid
+    r["title"] = title
+    r["description"] = description
+    r["acceptance_criteria"] = ac
+    r["priority"] = priority
+    r["epic"] = epic
+    return r
 
 def validate_test_case(t: Dict[str, Any]) -> Dict[str, Any]:
     """
     Normalises a test case dict and adds `gherkin_valid: bool`.
     - scenario_type ∈ {positive, negative, regression} (lowercased)
     - ensures tags include the scenario tag (e.g., @positive)
-    - minimal Gherkin check: contains Scenario:, Given, When, Then
+    - minimal Gherkin check: contains Scenario: and Given, When, Then (in that order)
     """
     t = dict(t or {})
     req_id = _norm_req_id(t.get("requirement_id", ""))
     scenario = _as_str(t.get("scenario_type")).strip().lower()
-    if scenario not in ALLOWED_SCENARIOS:
-        # try soft-mapping common aliases
-        if scenario in {"pos"}: scenario = "positive"
-        elif scenario in {"neg"}: scenario = "negative"
-        elif scenario in {"reg", "regress"}: scenario = "regression"
-        else: scenario = _as_str(scenario)
+    # soft-map common aliases; unknown values pass through
+    scenario = _SCENARIO_ALIAS.get(scenario, scenario)
 
     g = _as_str(t.get("gherkin")).strip()
     # minimal gherkin validity
-    has_tokens = all(tok in g for tok in ("Scenario:", "Given", "When", "Then"))
+    has_tokens = _has_gherkin_tokens(g)
 
     tags = _norm_tags(t.get("tags"))
-    scenario_tag = f"@{scenario}" if scenario in ALLOWED_SCENARIOS else None
+    scenario_tag = _SCENARIO_TAG.get(scenario)
     if scenario_tag and scenario_tag not in tags:
         tags.append(scenario_tag)
 
@@ -132,18 +170,24 @@ def dedupe_requirements(reqs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     Keeps the first occurrence (stable).
     """
     out: List[Dict[str, Any]] = []
-    seen: set[Tuple[str, str]] = set()
-    for r in reqs:
-        rid = _norm_req_id(r.get("id", ""))
-        if REQ_ID_RE.match(rid):
-            key = ("ID", rid)  # prioritise explicit IDs
+    seen: Dict[Tuple[str, str], int] = {}  # key -> index of its first occurrence
+    for i, r in enumerate(reqs):
+        raw = _as_str(r.get("id", "")).strip().upper()
+        # already canonical (REQ-001, REQ-1234; not REQ-0001) -> skip the normaliser
+        if REQ_ID_RE.match(raw) and (len(raw) == 7 or raw[4] != "0"):
+            key = ("ID", raw)
         else:
-            key = (
-                _as_str(r.get("title")).strip().lower(),
-                _as_str(r.get("description")).strip().lower(),
-            )
-        if key in seen:
+            rid = _norm_req_id(raw)
+            if REQ_ID_RE.match(rid):
+                key = ("ID", rid)  # prioritise explicit IDs
+            else:
+                # title/description only lowered when there is no usable id
+                key = (
+                    _as_str(r.get("title")).strip().lower(),
+                    _as_str(r.get("description")).strip().lower(),
+                )
+        # membership test + insert in one call: only the first occurrence stores its own index
+        if seen.setdefault(key, i) != i:
             continue
-        seen.add(key)
         out.append(r)
-    return out
\ No newline at end of file
+    return out
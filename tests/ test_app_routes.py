@@ -1,12 +1,6 @@
 # tests/test_app_routes.py
-import os, importlib, types
-
-def test_home_sets_cookie_and_shows_session(db, monkeypatch):
-    # import after env/DB are ready
-    app_module = importlib.import_module("app.app")
-    app = app_module.app
-    client = app.test_client()
 
+def test_home_sets_cookie_and_shows_session(db, client):
     res = client.get("/")
     assert res.status_code == 200
     # cookie set
@@ -16,11 +10,7 @@ def test_home_sets_cookie_and_shows_session(db, monkeypatch):
     assert "Session" in html
     assert "Requirements Review" in html
 
-def test_api_session_json(db):
-    app_module = importlib.import_module("app.app")
-    app = app_module.app
-    client = app.test_client()
-
+def test_api_session_json(db, client):
     res = client.get("/api/session")
     assert res.status_code == 200
     data = res.get_json()
@@ -28,7 +18,7 @@ def test_api_session_json(db):
     assert "session_id" in data
     assert "session" in data
 
-def test_resume_button_calls_pipeline(db, monkeypatch):
+def test_resume_button_calls_pipeline(db, client, monkeypatch):
     # mock subprocess.run so we don't actually run the pipeline
     called = {"ok": False, "cmd": None}
     def fake_run(cmd, check):
@@ -41,10 +31,6 @@ def test_resume_button_calls_pipeline(db, monkeypatch):
     # ensure TRANSCRIPT_FILE optional
     monkeypatch.delenv("TRANSCRIPT_FILE", raising=False)
 
-    app_module = importlib.import_module("app.app")
-    app = app_module.app
-    client = app.test_client()
-
     # visit home to get a cookie sid
     client.get("/")
     res = client.post("/run", follow_redirects=False)
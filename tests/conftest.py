@@ -1,5 +1,6 @@
 # tests/conftest.py
 import os, sys, pathlib, sqlite3, json
+from collections import namedtuple
 import pytest
 
 # Put repo root on sys.path so 'app', 'agents', 'run_pipeline', etc. import cleanly.
@@ -29,52 +30,83 @@ def sample_vtt(tmp_path, monkeypatch):
     monkeypatch.setenv("TRANSCRIPT_FILE", str(p))
     return str(p)
 
+# minimal sessions schema so session helpers don’t explode (built once, reused per test)
+_SESSIONS_DDL = """
+CREATE TABLE IF NOT EXISTS sessions(
+  session_id TEXT PRIMARY KEY,
+  project_id TEXT,
+  rolling_summary TEXT,
+  last_actions_json TEXT,
+  updated_at TEXT
+);
+"""
+
+@pytest.fixture(scope="session")
+def _schema_template():
+    # DDL parsed once per session into memory; each test copies the pages with backup()
+    tpl = sqlite3.connect(":memory:")
+    tpl.executescript(_SESSIONS_DDL)
+    tpl.commit()
+    yield tpl
+    tpl.close()
+
 @pytest.fixture
-def db_conn():
+def db_conn(_schema_template):
     db = os.environ["REPO_DB_PATH"]
     conn = sqlite3.connect(db)
     conn.row_factory = sqlite3.Row
-    # ensure a minimal sessions schema so session helpers don’t explode
-    conn.executescript("""
-    CREATE TABLE IF NOT EXISTS sessions(
-      session_id TEXT PRIMARY KEY,
-      project_id TEXT,
-      rolling_summary TEXT,
-      last_actions_json TEXT,
-      updated_at TEXT
-    );
-    """)
-    conn.commit()
+    # stays a file at REPO_DB_PATH: app/run_pipeline open their own connections to it
+    _schema_template.backup(conn)
     yield conn
     conn.close()
 
+@pytest.fixture(scope="session")
+def app_module():
+    # import (blueprints, templates, schema setup) once per session, not per test
+    import importlib
+    mod = importlib.import_module("app.app")
+    mod.app.config["TESTING"] = True
+    return mod
+
+@pytest.fixture
+def client(app_module):
+    # fresh test client per test: no cookies carried over between tests
+    return app_module.app.test_client()
+
 # Some tests expect 'db' instead of 'db_conn'
 @pytest.fixture
 def db(db_conn):
     return db_conn
 
+# canned LLM replies, serialised once; responses mimic resp.choices[0].message.content
+_Msg = namedtuple("_Msg", "content")
+_Choice = namedtuple("_Choice", "message")
+_Resp = namedtuple("_Resp", "choices")
+
+_REQ_JSON = json.dumps([{
+    "id": "REQ-001",
+    "title": "Checkout requires AC",
+    "description": "Add AC for checkout flow",
+    "acceptance_criteria": ["Given user...", "When they pay...", "Then order complete"],
+    "priority": "High",
+    "epic": "Checkout"
+}])
+_TC_JSON = json.dumps([{
+    "requirement_id": "REQ-001",
+    "scenario_type": "positive",
+    "gherkin": "Scenario: success\nGiven user\nWhen pays\nThen ok",
+    "tags": ["@positive"]
+}])
+_REQ_RESP = _Resp((_Choice(_Msg(_REQ_JSON)),))
+_TC_RESP = _Resp((_Choice(_Msg(_TC_JSON)),))
+
 @pytest.fixture
 def stub_chat(monkeypatch):
+    # function-scoped: it relies on monkeypatch, which is per test
     import generate_req_bdd as core
     def _fake_chat(messages, model=None, temperature=None):
-        text = "\n".join(m["content"] for m in messages if m["role"] != "system")
-        if "Extract 3–6" in text:
-            content = json.dumps([{
-                "id": "REQ-001",
-                "title": "Checkout requires AC",
-                "description": "Add AC for checkout flow",
-                "acceptance_criteria": ["Given user...", "When they pay...", "Then order complete"],
-                "priority": "High",
-                "epic": "Checkout"
-            }])
-        else:
-            content = json.dumps([{
-                "requirement_id": "REQ-001",
-                "scenario_type": "positive",
-                "gherkin": "Scenario: success\nGiven user\nWhen pays\nThen ok",
-                "tags": ["@positive"]
-            }])
-        choice = type("c", (), {"message": type("m", (), {"content": content})})()
-        return type("Resp", (), {"choices": [choice]})()
+        # the task marker lives in the current prompt: the last non-system message
+        last = next((m["content"] for m in reversed(messages) if m["role"] != "system"), "")
+        return _REQ_RESP if "Extract 3–6" in last else _TC_RESP
     monkeypatch.setattr(core, "_chat", _fake_chat)
-    return
\ No newline at end of file
+    return
@@ -1,9 +1,6 @@
 # tests/test_app.py
-import app.app as web
 
-def test_session_start_endpoint(monkeypatch):
-    app = web.app
-    client = app.test_client()
+def test_session_start_endpoint(client):
     r = client.post("/api/session/start")
     assert r.status_code == 200
     assert r.json["ok"] is True
@@ -11,16 +8,12 @@ def test_session_start_endpoint(monkeypatch):
     # cookie set
     assert "session_id=" in r.headers.get("Set-Cookie","")
 
-def test_home_renders(monkeypatch):
-    app = web.app
-    client = app.test_client()
+def test_home_renders(client):
     r = client.get("/")
     assert r.status_code == 200
     assert b"Requirements Review" in r.data
 
-def test_heartbeat_logs_action(monkeypatch):
-    app = web.app
-    client = app.test_client()
+def test_heartbeat_logs_action(client):
     client.post("/api/session/start")
     r = client.post("/api/session/heartbeat", json={"page":"/"})
-    assert r.status_code == 200
\ No newline at end of file
+    assert r.status_code == 200
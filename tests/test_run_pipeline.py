@@ -14,3 +14,41 @@ def test_run_classic(sample_vtt, db_conn, stub_chat):
     sid = rp.ensure_session(db_conn, "myproject", "unit-sid-2")
     res = rp.run_classic(sample_vtt, "myproject", sid, db_conn)
     assert res["db_path"].endswith(".db") or "repo.db" in res["db_path"]
+
+def test_import_is_lightweight():
+    # agents.* / subprocess must only be imported by the code path that uses them
+    import subprocess, sys
+    code = (
+        "import sys, run_pipeline; "
+        "print(','.join(m for m in sys.modules if m == 'subprocess' or m.startswith('agents')))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=rp.os.path.dirname(rp.__file__),
+                         capture_output=True, text=True, check=True).stdout.strip()
+    assert out == ""
+
+def test_action_buffer_writes_on_flush(db_conn):
+    sid = rp.ensure_session(db_conn, "myproject", "unit-sid-3")
+    buf = rp._ActionBuffer(db_conn, sid, size=3)
+    buf.add({"actor": "pipeline", "action": "step", "step": "a"})
+    buf.add({"actor": "pipeline", "action": "step", "step": "b"})
+    n = db_conn.execute("SELECT COUNT(*) FROM memory_action WHERE session_id=?", (sid,)).fetchone()[0]
+    assert n == 0
+    buf.flush()
+    rows = db_conn.execute("SELECT step FROM memory_action WHERE session_id=? ORDER BY id", (sid,)).fetchall()
+    assert [r[0] for r in rows] == ["a", "b"]
+    assert rp.get_session_snapshot(db_conn, sid)["rolling_summary"]
+
+def test_export_csv_missing_dependency_is_reported_not_forked(db_conn, monkeypatch):
+    import builtins, subprocess
+    real_import = builtins.__import__
+    def fake_import(name, *a, **kw):
+        if name == "export_csv":
+            raise ModuleNotFoundError("No module named 'pandas'", name="pandas")
+        return real_import(name, *a, **kw)
+    monkeypatch.setattr(builtins, "__import__", fake_import)
+    monkeypatch.setattr(subprocess, "run", lambda *a, **kw: (_ for _ in ()).throw(AssertionError("forked")))
+    monkeypatch.chdir(rp.os.path.dirname(rp.__file__))
+    sid = rp.ensure_session(db_conn, "myproject", "unit-sid-4")
+    rp._export_csv_step(db_conn, sid)
+    last = rp.get_session_snapshot(db_conn, sid)["last_actions"][-1]
+    assert last["action"] == "export_csv_failed" and "pandas" in last["error"]
@@ -18,4 +18,21 @@ def test_dedupe_prefers_ids():
     a = {"id":"REQ-001", "title":"t", "description":"d"}
     b = {"id":"REQ-001", "title":"t", "description":"d"}
     out = dedupe_requirements([a,b])
-    assert len(out) == 1
\ No newline at end of file
+    assert len(out) == 1
+
+def test_gherkin_tokens_must_be_ordered():
+    ok = validate_test_case({"scenario_type":"neg","gherkin":"Scenario: X\nGiven a\nAnd b\nWhen c\nThen d"})
+    bad = validate_test_case({"scenario_type":"neg","gherkin":"Then d\nWhen c\nGiven a\nScenario: X"})
+    assert ok["gherkin_valid"] is True
+    assert bad["gherkin_valid"] is False
+    bg = validate_test_case({"scenario_type":"pos",
+                             "gherkin":"Feature: f\nBackground:\n Given logged in\nScenario: s\n When pay\n Then ok"})
+    assert bg["gherkin_valid"] is True
+
+def test_dedupe_keeps_first_and_falls_back_to_title():
+    a = {"id":"req-1", "title":"A"}
+    b = {"id":"REQ-001", "title":"B"}
+    c = {"id":"", "title":"Pay", "description":"Card"}
+    d = {"id":"", "title":" pay ", "description":"CARD"}
+    out = dedupe_requirements([a, b, c, d, a])
+    assert out == [a, c]
@@ -1,7 +1,7 @@
 # tests/test_session_helpers.py
 import sqlite3, json, os
 from run_pipeline import (
-    get_conn, ensure_session, append_action, session_set, session_get,
+    get_conn, ensure_session, append_action, session_set, session_set_many, session_get,
     get_session_snapshot, get_compact_context
 )
 
@@ -25,4 +25,78 @@ def test_session_kv_and_compact_context(db):
     assert "Users reset password" in ctx
     # KV get
     val = session_get(conn, sid, "last_transcript_summary", "")
-    assert "expiry 10m" in val
\ No newline at end of file
+    assert "expiry 10m" in val
+
+def test_compact_context_sees_new_writes(db):
+    conn = get_conn()
+    sid = ensure_session(conn, "myproject", None)
+    assert "Refunds" not in get_compact_context(conn, sid)
+    session_set(conn, sid, "last_transcript_summary", "Refunds within 14 days.")
+    assert "Refunds within 14 days." in get_compact_context(conn, sid)
+
+def test_memory_rolling_summary_prepends_newest_first(db):
+    conn = get_conn()
+    sid = ensure_session(conn, "myproject", None)
+    append_action(conn, sid, {"actor":"pipeline","action":"start","mode":"agentic"})
+    append_action(conn, sid, {"actor":"pipeline","action":"step","step":"tests"})
+    assert session_get(conn, sid, "rolling_summary").startswith("• step tests\n• start agentic\n")
+
+def test_session_set_many_single_commit(db):
+    conn = get_conn()
+    sid = ensure_session(conn, "myproject", None)
+    commits = []
+    conn.set_trace_callback(lambda sql: commits.append(sql) if sql.startswith("COMMIT") else None)
+    session_set_many(conn, sid, {"last_transcript_path": "m.vtt", "last_transcript_summary": "OTP reset."})
+    conn.set_trace_callback(None)
+    assert len(commits) == 1
+    other = get_conn()  # committed, so visible to a second connection
+    assert session_get(other, sid, "last_transcript_path") == "m.vtt"
+    assert session_get(other, sid, "last_transcript_summary") == "OTP reset."
+
+def test_snapshot_sees_new_writes(db):
+    conn = get_conn()
+    sid = ensure_session(conn, "myproject", None)
+    append_action(conn, sid, {"actor":"pipeline","action":"start","mode":"agentic"})
+    assert len(get_session_snapshot(conn, sid)["last_actions"]) == 1
+    append_action(conn, sid, {"actor":"pipeline","action":"end","mode":"agentic"})
+    assert len(get_session_snapshot(conn, sid)["last_actions"]) == 2
+    # a commit from another connection is picked up too
+    session_set(get_conn(), sid, "ui_state", "review")
+    assert get_session_snapshot(conn, sid)["ui_state"] == "review"
+
+def test_action_payload_null_when_empty(db):
+    conn = get_conn()
+    sid = ensure_session(conn, "myproject", None)
+    append_action(conn, sid, {"actor":"pipeline","action":"start","mode":"agentic"})
+    append_action(conn, sid, {"actor":"pipeline","action":"step","step":"tests","reqs":3})
+    rows = conn.execute("SELECT payload FROM memory_action WHERE session_id=? ORDER BY id", (sid,)).fetchall()
+    assert rows[0]["payload"] is None
+    assert json.loads(rows[1]["payload"]) == {"reqs": 3}
+    start, step = get_session_snapshot(conn, sid)["last_actions"]
+    assert start["mode"] == "agentic" and step["step"] == "tests" and step["reqs"] == 3
+
+def test_snapshot_shows_review_actions_not_heartbeats(db):
+    import app.review as rv
+    conn = get_conn()
+    sid = ensure_session(conn, "myproject", None)
+    rv.ensure_session(conn, "myproject", sid)
+    rv.append_action(conn, sid, {"actor":"user","action":"approve","item_id":"REQ-001"})
+    for _ in range(12):  # app/app.py _log_action heartbeat rows
+        conn.execute("INSERT INTO memory_action(session_id, ts, actor, action, payload) VALUES(?,?,?,?,?)",
+                     (sid, 2**31, "ui", "heartbeat", json.dumps({"page": "/"})))
+    conn.commit()
+    snap = get_session_snapshot(conn, sid)
+    assert snap["rolling_summary"] == "Recent actions:\n• approve REQ-001"
+    assert [a["item_id"] for a in snap["last_actions"]] == ["REQ-001"]
+
+def test_run_start_block_single_commit(db):
+    import run_pipeline as rp
+    conn = get_conn()
+    sid = ensure_session(conn, "myproject", None)
+    trace = []
+    conn.set_trace_callback(lambda sql: trace.append(sql.split()[0]) if sql.startswith(("BEGIN", "COMMIT")) else None)
+    rp._record_run_start(conn, sid, {"last_transcript_path": "m.vtt", "last_transcript_summary": "OTP reset."})
+    conn.set_trace_callback(None)
+    assert trace == ["BEGIN", "COMMIT"]
+    assert session_get(get_conn(), sid, "last_transcript_path") == "m.vtt"
+    assert get_session_snapshot(conn, sid)["last_actions"][-1]["action"] == "start"
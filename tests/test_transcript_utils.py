@@ -8,3 +8,18 @@ def test_read_vtt_and_summarize(sample_vtt):
     s = _quick_summarize(long, max_len=50)
     assert len(s) <= 50
     assert "…" in s or "..." in s
+
+def test_summarize_bytes_matches_str():
+    raw = ("Customer wants refunds processed within 14 days. " * 400)
+    assert _quick_summarize(raw.encode("utf-8"), max_len=80) == _quick_summarize(raw, max_len=80)
+
+def test_quick_summarize_keeps_middle_of_whitespace_heavy_input():
+    text = "a" * 100 + " " * 3000 + "MIDDLE" + " " * 3000 + "b" * 100
+    expected = "a" * 100 + " MIDDLE " + "b" * 100
+    assert _quick_summarize(text) == expected
+    assert _quick_summarize(text.encode("utf-8")) == expected
+
+def test_quick_summarize_collapses_nbsp_and_form_feeds():
+    assert _quick_summarize("Hello\xa0world") == "Hello world"
+    assert _quick_summarize("a \xa0 b") == "a b"
+    assert _quick_summarize("a\x0cb\x0bc") == "a b c"